@@ -94,6 +94,52 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+#
+# Local memory is private to each process. When running several gunicorn workers, point LRC_DATABASE_CACHE_DIR at a
+# directory they can all write to so that invalidations made by one worker are seen by the others. Without it, values
+# other workers may change are only kept for a short while (main.caching.LOCAL_CACHE_TIMEOUT).
+#
+# Once the cache directory holds MAX_ENTRIES files, every write deletes a random third of them, version stamps
+# included, and cached values keep missing from then on. Entries left under a retired version stamp stay on disk until
+# then, so the limit has to cover those as well as the live ones:
+#   - 2 per user (a version stamp and the group names), whose retired copies expire after 10 minutes;
+#   - 2 per week shown on each schedule (kind), one for privileged viewers and one for the rest, each left behind
+#     whenever a shift changes and expiring after a day;
+#   - a handful of single entries (alert counts, the active semester and their stamps).
+# The default of 5000 covers a few hundred users, a semester of weeks for every kind, and a busy day of shift edits.
+
+if CACHE_DIR := os.environ.get("LRC_DATABASE_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR,
+            "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("LRC_DATABASE_CACHE_MAX_ENTRIES", "5000"))},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Keep each user's group names in the cache between requests. Membership changes made through the app or the admin
+# invalidate them, but only in workers that share the cache, so this is off unless LRC_DATABASE_CACHE_DIR is set.
+# Changes made directly in the database are picked up after main.caching.USER_GROUPS_TIMEOUT.
+
+CACHE_USER_GROUPS = os.environ.get("LRC_DATABASE_CACHE_USER_GROUPS", "1" if CACHE_DIR else "0") == "1"
+
+# How many shift change requests a queue page lists by default. A page can ask for up to 500 with ?size=.
+
+REQUEST_QUEUE_PAGE_SIZE = int(os.environ.get("LRC_DATABASE_REQUEST_QUEUE_PAGE_SIZE", "50"))
+
+# How many users a page of the user list shows.
+
+USER_LIST_PAGE_SIZE = int(os.environ.get("LRC_DATABASE_USER_LIST_PAGE_SIZE", "100"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -11,6 +11,7 @@ from .models import (
     LRCDatabaseUser,
     StaffUserPosition,
     Shift,
+    PayrollLedger,
     ShiftChangeRequest,
     Hardware,
     Loan
@@ -103,6 +104,30 @@ class ShiftAdmin(admin.ModelAdmin):
     )
     ordering = ("start",)
 
+@admin.register(PayrollLedger)
+class PayrollLedgerAdmin(admin.ModelAdmin):
+    list_display = (
+        "person",
+        "position",
+        "start",
+        "hours",
+        "pay",
+        "late"
+    )
+    ordering = ("start",)
+
+    # The ledger is derived from shifts (see ledger.py), so it is only for viewing here. Edits would be undone by the
+    # next sync or rebuildpayrollledger; change the shift instead.
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(ShiftChangeRequest)
 class ShiftChangeRequestAdmin(admin.ModelAdmin):
     list_display = (
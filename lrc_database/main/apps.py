@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "main"
+
+    def ready(self) -> None:
+        # Connects the cache invalidation receivers.
+        from . import signals  # noqa: F401
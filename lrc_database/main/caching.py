@@ -0,0 +1,82 @@
+"""
+Keys for values that are read on nearly every page but change rarely. They live in Django's cache framework (see
+CACHES in settings.py) and are invalidated by the receivers in signals.py whenever the underlying rows change.
+"""
+
+import uuid
+from typing import Optional
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+ALERT_COUNTS = "alert_counts"
+
+# Upper bound on how long a value may survive writes that bypass model signals, such as QuerySet.update().
+ALERT_COUNTS_TIMEOUT = 5 * 60
+
+ACTIVE_SEMESTER = "active_semester"
+
+# Rendered weeks of the schedule. They stay valid until a write bumps the stamp, so the timeout only clears out weeks
+# that nobody asks for anymore.
+SCHEDULE = "schedule"
+SCHEDULE_TIMEOUT = 24 * 60 * 60
+
+
+# How long a worker may keep an entry when the cache is local memory. Each process has its own, so the stamp bumps and
+# deletes made by other workers never reach it, and this is the longest it can go on serving what they changed.
+LOCAL_CACHE_TIMEOUT = 30
+
+
+def shared_timeout(timeout: Optional[int]) -> Optional[int]:
+    """
+    The timeout to store an entry under, given the one it should have in a cache all workers share. Local memory is
+    private to each process, so there it is capped at LOCAL_CACHE_TIMEOUT.
+    """
+
+    if isinstance(caches["default"], LocMemCache):
+        return LOCAL_CACHE_TIMEOUT if timeout is None else min(timeout, LOCAL_CACHE_TIMEOUT)
+    return timeout
+
+
+# Group names are what restrict_to_groups checks, so they are dropped after a while even if nothing bumps their
+# stamp, e.g. when memberships are edited directly in the database.
+USER_GROUPS_TIMEOUT = 10 * 60
+
+
+def user_groups_key(user_id: int) -> str:
+    # Each user's group names have a version stamp of their own, under this name.
+    return f"user_groups:{user_id}"
+
+
+def _version_key(name: str) -> str:
+    return f"{name}:version"
+
+
+def cache_version(name: str) -> str:
+    """
+    Current version stamp for a family of cache entries. Entries are stored under keys that include the stamp, so
+    bumping it invalidates all of them at once in every worker sharing the cache.
+    """
+
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_cache_version(name: str) -> None:
+    # A random stamp rather than a counter, so an evicted stamp can never come back and revive stale entries.
+    cache.set(_version_key(name), uuid.uuid4().hex, None)
+
+
+def bump_cache_version_on_commit(name: str) -> None:
+    # After the commit, so that no worker can cache the old state again in the meantime.
+    transaction.on_commit(lambda: bump_cache_version(name))
+
+
+def versioned_key(name: str, *parts: object) -> str:
+    return ":".join([name, cache_version(name), *map(str, parts)])
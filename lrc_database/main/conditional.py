@@ -0,0 +1,50 @@
+"""
+Conditional GET for the shift feeds that calendars poll over and over. Each response carries an ETag that costs far
+less to compute than the response itself, and a request presenting the current one gets 304 Not Modified without the
+body being built.
+
+There is deliberately no Last-Modified. A timestamp can't show a shift leaving the set, through a drop, a delete or a
+move, and If-Modified-Since would keep answering 304 for a set that lost rows.
+"""
+
+import hashlib
+from typing import Callable, Optional
+
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+
+def make_etag(*parts: object) -> str:
+    return quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+
+def shifts_validator(shifts: QuerySet) -> str:
+    """
+    ETag for a set of shifts, from their latest modified_at (to the microsecond) and their count: saving a shift moves
+    the former, and a shift leaving the set through a delete or an edit changes the latter.
+    """
+
+    stats = shifts.order_by().aggregate(last_modified=Max("modified_at"), count=Count("id"))
+    return make_etag(stats["last_modified"], stats["count"])
+
+
+def conditional_response(
+    request: HttpRequest,
+    build: Callable[[], HttpResponseBase],
+    etag: str,
+) -> HttpResponseBase:
+    """
+    Answers 304 if the request's If-None-Match is still current, and otherwise calls build for the full response.
+    Either way the ETag goes out with it, and clients are told to revalidate before reusing it. The responses depend
+    on who is asking, so they are only for the browser's cache.
+    """
+
+    response: Optional[HttpResponseBase] = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
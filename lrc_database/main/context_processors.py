@@ -1,6 +1,5 @@
 from typing import TypedDict, Union
 
-from django.db.models import Q
 from django.http.request import HttpRequest
 
 from .models import ShiftChangeRequest
@@ -33,35 +32,17 @@ def alert_counts(request: HttpRequest) -> Union[AlertCountDict, EmptyDict]:
     if not is_privileged(request.user):
         return {}
 
-    si_count = ShiftChangeRequest.objects.filter(
-        Q(new_kind="SI") | 
-        Q(new_position__position="SI") | 
-        Q(shift_to_update__position__position="SI"))
-    new_si_count_change = si_count.filter(is_drop_request=False, state="New").count()
-    pending_si_count_change = si_count.filter(is_drop_request=False, state="Pending").count()
-    si_count_drop = si_count.filter(is_drop_request=True, state="New").count()
-
-    gt_count = ShiftChangeRequest.objects.filter(
-        Q(new_kind="Group Tutoring") | 
-        Q(new_position__position="GT") | 
-        Q(shift_to_update__position__position="GT"))
-    new_gt_count_change = gt_count.filter(is_drop_request=False, state="New").count()
-    pending_gt_count_change = gt_count.filter(is_drop_request=False, state="Pending").count()
-    gt_count_drop = gt_count.filter(is_drop_request=True, state="New").count()
-
-    tutoring_count = ShiftChangeRequest.objects.filter(
-        (Q(new_kind="Tutoring") | 
-         Q(new_position__position="Tutoring") | 
-         Q(shift_to_update__position__position="Tutoring")), state="New")
-    tutoring_count_change = tutoring_count.filter(is_drop_request=False).count()
-    tutoring_count_drop = tutoring_count.filter(is_drop_request=True).count()
-
-    om_count = ShiftChangeRequest.objects.filter(
-        (Q(new_kind="OURS Mentor") | 
-         Q(new_position__position="OursM") | 
-         Q(shift_to_update__position__position="OursM")), state="New")
-    om_count_change = om_count.filter(is_drop_request=False).count()
-    om_count_drop = om_count.filter(is_drop_request=True).count()
+    counts = ShiftChangeRequest.objects.cached_alert_counts()
+    new_si_count_change = counts["new_si_change_count"]
+    pending_si_count_change = counts["pending_si_change_count"]
+    si_count_drop = counts["si_drop_count"]
+    new_gt_count_change = counts["new_gt_change_count"]
+    pending_gt_count_change = counts["pending_gt_change_count"]
+    gt_count_drop = counts["gt_drop_count"]
+    tutoring_count_change = counts["tutoring_change_count"]
+    tutoring_count_drop = counts["tutoring_drop_count"]
+    om_count_change = counts["om_change_count"]
+    om_count_drop = counts["om_drop_count"]
 
     total_si = new_si_count_change + pending_si_count_change + si_count_drop
     total_gt = new_gt_count_change + pending_gt_count_change + gt_count_drop
@@ -226,7 +226,10 @@ class NewShiftRecurringForm(forms.ModelForm):
     recurring_end_date = forms.DateField(
         help_text="Format: DD/MM/YYYY", 
         widget = forms.widgets.DateInput(attrs={'type': 'date'}))
-    recurring_day_of_week = forms.ChoiceField(choices=[(0,"Monday"),(1,"Tuesday"),(2,"Wednesday"),(3,"Thurday"),(4,"Friday"),(5,"Saturday"),(6,"Sunday")])
+    recurring_days_of_week = forms.TypedMultipleChoiceField(
+        coerce=int,
+        choices=[(0,"Monday"),(1,"Tuesday"),(2,"Wednesday"),(3,"Thurday"),(4,"Friday"),(5,"Saturday"),(6,"Sunday")],
+        widget=forms.CheckboxSelectMultiple)
     class Meta:
         model = Shift
         exclude = ("start","signed","attended","reason", "late", "late_datetime", "deleted")
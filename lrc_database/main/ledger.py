@@ -0,0 +1,169 @@
+import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import groupby
+from typing import Iterable, Iterator, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PayrollLedger, Semester, Shift, StaffUserPosition
+
+CENT = Decimal("0.01")
+
+# The columns of a ledger row, by attribute name, which are compared and copied when a row is synced.
+LEDGER_FIELDS = (
+    "shift_id",
+    "person_id",
+    "position_id",
+    "start",
+    "week_start",
+    "weekday",
+    "hours",
+    "pay",
+    "kind",
+    "late",
+    "late_datetime",
+)
+
+
+def get_hours_and_pay(duration: datetime.timedelta, hourly_rate: Decimal) -> Tuple[Decimal, Decimal]:
+    """
+    Hours and pay for one shift, each rounded to the cent. Kept in Decimal so that summing hundreds of shifts can't
+    drift the way float sums do.
+    """
+    hours = Decimal(duration.seconds) / 3600
+    pay = hours * hourly_rate
+    return hours.quantize(CENT, ROUND_HALF_UP), pay.quantize(CENT, ROUND_HALF_UP)
+
+
+def is_payable(shift: Shift) -> bool:
+    return shift.signed and shift.attended and not shift.deleted
+
+
+def ledger_entry_for(shift: Shift) -> PayrollLedger:
+    """
+    Builds, without saving, the ledger row for a shift. Payroll pages also use this for shifts that aren't signed
+    yet, so that both kinds of row can be laid out the same way.
+    """
+
+    start = timezone.localtime(shift.start)
+    weekday = (start.weekday() + 1) % 7
+    hours, pay = get_hours_and_pay(shift.duration, shift.position.hourly_rate)
+    return PayrollLedger(
+        shift=shift,
+        person_id=shift.position.person_id,
+        position=shift.position,
+        start=shift.start,
+        week_start=start.date() - datetime.timedelta(days=weekday),
+        weekday=weekday,
+        hours=hours,
+        pay=pay,
+        kind=shift.kind,
+        late=shift.late,
+        late_datetime=shift.late_datetime,
+    )
+
+
+def sync_shift(shift: Shift) -> None:
+    """
+    Brings the ledger row of one shift in line with it: written once the shift is signed and attended, removed if it
+    stops being either or gets deleted.
+    """
+
+    if not is_payable(shift):
+        PayrollLedger.objects.filter(shift_id=shift.pk).delete()
+        return
+    entry = ledger_entry_for(shift)
+    defaults = {name: getattr(entry, name) for name in LEDGER_FIELDS if name != "shift_id"}
+    PayrollLedger.objects.update_or_create(shift_id=shift.pk, defaults=defaults)
+
+
+def sync_shifts(shift_ids: Iterable[int]) -> None:
+    """
+    Resyncs many shifts at once, for writes such as bulk_update() that don't fire model signals.
+    """
+
+    shift_ids = list(shift_ids)
+    shifts = Shift.objects.filter(id__in=shift_ids, signed=True, attended=True).select_related("position")
+    entries = [ledger_entry_for(shift) for shift in shifts]
+    with transaction.atomic():
+        PayrollLedger.objects.filter(shift_id__in=shift_ids).delete()
+        PayrollLedger.objects.bulk_create(entries)
+
+
+def sync_position(position: StaffUserPosition) -> None:
+    # A changed hourly rate changes the pay of every shift already on the ledger for the position.
+    sync_shifts(PayrollLedger.objects.filter(position=position).values_list("shift_id", flat=True))
+
+
+def rebuild() -> Tuple[int, int]:
+    """
+    Recomputes the whole ledger from the shift table. Returns the number of rows written and the number of rows that
+    were missing, stale or orphaned before the rebuild.
+    """
+
+    shifts = Shift.objects.filter(signed=True, attended=True).select_related("position")
+    expected = {entry.shift_id: entry for entry in map(ledger_entry_for, shifts)}
+    existing = {entry.shift_id: entry for entry in PayrollLedger.objects.all()}
+
+    corrected = 0
+    for shift_id in expected.keys() | existing.keys():
+        old, new = existing.get(shift_id), expected.get(shift_id)
+        if old is None or new is None or any(getattr(old, name) != getattr(new, name) for name in LEDGER_FIELDS):
+            corrected += 1
+
+    with transaction.atomic():
+        PayrollLedger.objects.all().delete()
+        PayrollLedger.objects.bulk_create(expected.values(), batch_size=1000)
+    return len(expected), corrected
+
+
+EXPORT_HEADER = (
+    "Name",
+    "Email",
+    "Position",
+    "Week",
+    "Sunday",
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Total Hours",
+    "Hourly Rate",
+    "Pay",
+)
+
+
+def export_rows(semester: Semester, chunk_size: int = 2000) -> Iterator[Tuple]:
+    """
+    Yields the semester's payroll as spreadsheet rows, header first, then one row per person, position and week.
+    The ledger is read in chunks of chunk_size rows, ordered so that each row's entries come back next to each other,
+    which keeps memory flat however many shifts the semester has.
+    """
+
+    yield EXPORT_HEADER
+    entries = (
+        PayrollLedger.objects.filter(position__semester=semester)
+        .select_related("person", "position__person", "position__si_course__course")
+        .order_by("person__last_name", "person__first_name", "person_id", "position_id", "week_start")
+        .iterator(chunk_size=chunk_size)
+    )
+    for _, group in groupby(entries, key=lambda entry: (entry.person_id, entry.position_id, entry.week_start)):
+        days = [Decimal(0)] * 7
+        pay = Decimal(0)
+        for entry in group:
+            days[entry.weekday] += entry.hours
+            pay += entry.pay
+        person = entry.person
+        yield (
+            f"{person.first_name} {person.last_name}",
+            person.email,
+            str(entry.position),
+            entry.week_start.isoformat(),
+            *days,
+            sum(days),
+            entry.position.hourly_rate,
+            pay,
+        )
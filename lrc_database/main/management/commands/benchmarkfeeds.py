@@ -0,0 +1,65 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
+from django.utils import timezone
+from main import feeds
+from main.color_coder import color_coder
+from main.models import Shift
+
+
+class Command(BaseCommand):
+    """
+    Times how long the event feeds take to serialize shifts, per 1000 shifts, for the shared serializer in feeds.py
+    and for the per-shift code it replaced. Runs on generated shifts, so no database rows are needed.
+    Example:
+        manage.py benchmarkfeeds --shifts 20000 --repeat 5
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shifts", type=int, default=10000, help="Number of shifts to serialize.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs of each; the fastest is reported.")
+
+    def handle(self, *args, **options):
+        count = options["shifts"]
+        start = timezone.now().replace(microsecond=0)
+        rows = [
+            (i + 1, start + datetime.timedelta(hours=i), datetime.timedelta(minutes=75), "Tutoring", "LGRT 1st floor")
+            for i in range(count)
+        ]
+        shifts = [
+            Shift(id=shift_id, start=shift_start, duration=duration, kind=kind, location=location)
+            for shift_id, shift_start, duration, kind, location in rows
+        ]
+
+        def per_shift():
+            events = [
+                {
+                    "id": str(shift.id),
+                    "start": shift.start.isoformat(),
+                    "end": (shift.start + shift.duration).isoformat(),
+                    "title": str(shift),
+                    "allDay": False,
+                    "url": reverse("view_shift", args=(shift.id,)),
+                    "color": color_coder(shift.kind),
+                }
+                for shift in shifts
+            ]
+            return json.dumps(events, cls=DjangoJSONEncoder).encode()
+
+        def shared():
+            return feeds.encode_events(feeds.events_from_rows(rows, color_coder, feeds.get_shift_url_prefix()))
+
+        encoder = "orjson" if feeds.orjson is not None else "json"
+        print(f"Serializing {count} shifts, best of {options['repeat']}, encoding with {encoder}:")
+        for name, serialize in (("per-shift reverse() and str()", per_shift), ("feeds.py", shared)):
+            best = min(self.time(serialize) for _ in range(options["repeat"]))
+            print(f"  {name}: {best / count * 1000 * 1000:.2f} ms per 1000 shifts")
+
+    def time(self, serialize) -> float:
+        started = time.perf_counter()
+        serialize()
+        return time.perf_counter() - started
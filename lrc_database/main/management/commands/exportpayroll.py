@@ -0,0 +1,34 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from main.ledger import export_rows
+from main.models import Semester
+
+
+class Command(BaseCommand):
+    """
+    Writes a semester's payroll as CSV, one row per person, position and week. Defaults to the active semester and
+    to standard output.
+    Example:
+        manage.py exportpayroll --semester "SPRING 2023" --output payroll.csv
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--semester", type=str, help="Name of the semester, defaults to the active one.")
+        parser.add_argument("--output", type=str, help="File to write to, defaults to standard output.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Ledger rows fetched per query.")
+
+    def handle(self, *args, **options):
+        if options["semester"] is None:
+            semester = Semester.objects.get_active_sem()
+        else:
+            semester = Semester.objects.filter(name=options["semester"]).first()
+        if semester is None:
+            raise CommandError("No such semester.")
+
+        rows = export_rows(semester, chunk_size=options["chunk_size"])
+        if options["output"] is None:
+            csv.writer(self.stdout).writerows(rows)
+            return
+        with open(options["output"], "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
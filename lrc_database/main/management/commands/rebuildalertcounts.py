@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from main.models import ShiftChangeRequest
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the cached navbar alert counts from the ShiftChangeRequest table. Use this after editing requests
+    outside of the app, e.g. with QuerySet.update() or raw SQL, which doesn't fire the invalidation signals.
+    Example:
+        manage.py rebuildalertcounts
+    """
+
+    def handle(self, *args, **options):
+        counts = ShiftChangeRequest.objects.rebuild_alert_counts()
+        for name, count in counts.items():
+            print(f"{name}: {count}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from main import ledger
+
+
+class Command(BaseCommand):
+    """
+    Reconciles the payroll ledger against the shift table, rewriting every row from the shifts it is derived from.
+    Use this after editing shifts outside of the app, e.g. with QuerySet.update() or raw SQL.
+    Example:
+        manage.py rebuildpayrollledger
+    """
+
+    def handle(self, *args, **options):
+        written, corrected = ledger.rebuild()
+        print(f"Payroll ledger rebuilt with {written} rows, {corrected} of which were missing, stale or orphaned.")
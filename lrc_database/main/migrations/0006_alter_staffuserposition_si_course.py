@@ -0,0 +1,26 @@
+# Generated by Django 4.1.7 on 2026-10-18 05:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0005_alter_shift_kind_alter_shiftchangerequest_new_kind_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="staffuserposition",
+            name="si_course",
+            field=models.ForeignKey(
+                blank=True,
+                default=None,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="lrc_database_user_si_course",
+                to="main.fullcourse",
+                verbose_name="SI/Group-Tutor course",
+            ),
+        ),
+    ]
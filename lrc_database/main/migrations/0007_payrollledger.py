@@ -0,0 +1,102 @@
+# Generated by Django 4.1.7 on 2026-10-18 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_ledger(apps, schema_editor):
+    # Mirrors ledger.ledger_entry_for, which can't be imported here because it works on the current models.
+    import datetime
+    from decimal import ROUND_HALF_UP, Decimal
+
+    from django.utils import timezone
+
+    Shift = apps.get_model("main", "Shift")
+    PayrollLedger = apps.get_model("main", "PayrollLedger")
+    cent = Decimal("0.01")
+
+    entries = []
+    for shift in Shift.objects.filter(signed=True, attended=True, deleted=False).select_related("position"):
+        start = timezone.localtime(shift.start)
+        weekday = (start.weekday() + 1) % 7
+        hours = Decimal(shift.duration.seconds) / 3600
+        entries.append(
+            PayrollLedger(
+                shift=shift,
+                person_id=shift.position.person_id,
+                position=shift.position,
+                start=shift.start,
+                week_start=start.date() - datetime.timedelta(days=weekday),
+                weekday=weekday,
+                hours=hours.quantize(cent, ROUND_HALF_UP),
+                pay=(hours * shift.position.hourly_rate).quantize(cent, ROUND_HALF_UP),
+                kind=shift.kind,
+                late=shift.late,
+                late_datetime=shift.late_datetime,
+            )
+        )
+    PayrollLedger.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0006_alter_staffuserposition_si_course"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PayrollLedger",
+            fields=[
+                (
+                    "shift",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ledger_entry",
+                        serialize=False,
+                        to="main.shift",
+                    ),
+                ),
+                ("start", models.DateTimeField()),
+                ("week_start", models.DateField(help_text="Sunday of the week the shift starts in, local time.")),
+                (
+                    "weekday",
+                    models.PositiveSmallIntegerField(help_text="Day of the week the shift starts on, 0 being Sunday."),
+                ),
+                ("hours", models.DecimalField(decimal_places=2, max_digits=6)),
+                ("pay", models.DecimalField(decimal_places=2, max_digits=8)),
+                ("kind", models.CharField(max_length=14)),
+                ("late", models.BooleanField(default=False)),
+                ("late_datetime", models.DateTimeField(blank=True, null=True)),
+                (
+                    "person",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payroll_ledger",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "position",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payroll_ledger",
+                        to="main.staffuserposition",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("start",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="payrollledger",
+            index=models.Index(fields=["person", "start"], name="main_payrol_person__324080_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="payrollledger",
+            index=models.Index(fields=["start"], name="main_payrol_start_b32cd6_idx"),
+        ),
+        migrations.RunPython(populate_ledger, migrations.RunPython.noop),
+    ]
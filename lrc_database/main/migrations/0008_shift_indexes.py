@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-18 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0007_payrollledger"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(
+                condition=models.Q(("deleted", False)), fields=["start"], name="main_shift_live_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(fields=["position", "start"], name="main_shift_positio_c50615_idx"),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.7 on 2026-10-18 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0008_shift_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="shiftchangerequest",
+            index=models.Index(fields=["state", "new_start"], name="main_shiftc_state_0861f6_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="shiftchangerequest",
+            index=models.Index(
+                condition=models.Q(("state__in", ("New", "Pending"))),
+                fields=["state", "is_drop_request"],
+                name="main_scr_open_state_idx",
+            ),
+        ),
+    ]
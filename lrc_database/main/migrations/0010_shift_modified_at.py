@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-18 06:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0009_shiftchangerequest_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shift",
+            name="modified_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                help_text="When the shift was last changed. Feeds use it to tell calendars whether they need to reload.",
+            ),
+            preserve_default=False,
+        ),
+    ]
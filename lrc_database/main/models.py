@@ -1,15 +1,32 @@
 import datetime
+from typing import FrozenSet, List
 
-import pytz
 from django import forms
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core import validators
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Q, prefetch_related_objects
 from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
+from .caching import (
+    ACTIVE_SEMESTER,
+    ALERT_COUNTS,
+    ALERT_COUNTS_TIMEOUT,
+    SCHEDULE,
+    USER_GROUPS_TIMEOUT,
+    bump_cache_version,
+    bump_cache_version_on_commit,
+    shared_timeout,
+    user_groups_key,
+    versioned_key,
+)
 from .custom_validators import validate_course_number
+from .recurrence import weekly_dates
 
 class Course(models.Model):
     department = models.CharField(
@@ -42,7 +59,19 @@ class Course(models.Model):
 
 class SemesterManager(models.Manager):
     def get_active_sem(self):
-        return self.filter(active=True).first()
+        """
+        The active semester, or None. Nearly every page asks for it, so it is kept in the cache under a version stamp
+        that signals.py bumps whenever a semester is saved or deleted. Without a cache the workers share, each worker
+        only keeps it for LOCAL_CACHE_TIMEOUT seconds, since it would never see another worker's bump.
+        """
+
+        key = versioned_key(ACTIVE_SEMESTER)
+        cached = cache.get(key)
+        if cached is None:
+            # Wrapped in a tuple so that "no active semester" can be cached too.
+            cached = (self.filter(active=True).first(),)
+            cache.set(key, cached, shared_timeout(None))
+        return cached[0]
 
 class Semester(models.Model):
     name = models.CharField(
@@ -196,28 +225,74 @@ class LRCDatabaseUser(AbstractUser):
     class Meta:
         ordering = ('first_name','last_name','email')
 
+    @cached_property
+    def _active_position_rows(self) -> List["StaffUserPosition"]:
+        # The one load of this user's active-semester positions that active_roles and active_positions share.
+        return list(
+            StaffUserPosition.objects.filter(person=self, semester__active=True).select_related("si_course__course")
+        )
+
+    @cached_property
+    def active_roles(self) -> FrozenSet[str]:
+        """
+        Positions (SI, Tutor, PM, GT, OursM) this user holds in the active semester. Loaded with one query and kept on
+        the instance, so every role check made while handling a request shares it.
+        """
+
+        return frozenset(position.position for position in self._active_position_rows)
+
+    @cached_property
+    def active_positions(self) -> List["StaffUserPosition"]:
+        """
+        This user's positions in the active semester, with the SI course, tutored courses and peers each one needs
+        loaded alongside it. The position_helper filters all read from this list, so showing them takes the same
+        handful of queries however many positions, courses or peers there are. The positions themselves are the ones
+        active_roles was read from, and the courses and peers are only fetched the first time this is asked for.
+        """
+
+        positions = self._active_position_rows
+        prefetch_related_objects(positions, "tutor_courses", "peers")
+        return positions
+
+    @cached_property
+    def group_names(self) -> FrozenSet[str]:
+        """
+        Names of the groups this user belongs to, loaded once per instance like active_roles. With
+        CACHE_USER_GROUPS on, they are also kept in the cache between requests, under a version stamp of the user's
+        own that signals.py bumps when their membership changes.
+        """
+
+        if not settings.CACHE_USER_GROUPS:
+            return frozenset(self.groups.values_list("name", flat=True))
+
+        # The key is read before the groups, so names read before a change commits are stored under the old stamp.
+        key = versioned_key(user_groups_key(self.pk))
+        names = cache.get(key)
+        if names is None:
+            names = frozenset(self.groups.values_list("name", flat=True))
+            cache.set(key, names, shared_timeout(USER_GROUPS_TIMEOUT))
+        return names
+
+    def in_groups(self, *groups: str) -> bool:
+        return not self.group_names.isdisjoint(groups)
+
     def is_privileged(self) -> bool:
-        return self.groups.filter(name__in=("Office staff", "Supervisors")).exists()
+        return self.in_groups("Office staff", "Supervisors")
 
     def is_si(self) -> bool:
-        num_si_position = StaffUserPosition.objects.filter(person=self, semester=Semester.objects.get_active_sem(), position="SI").count()
-        return num_si_position > 0
-    
+        return "SI" in self.active_roles
+
     def is_tutor(self) -> bool:
-        num_tutor_position = StaffUserPosition.objects.filter(person=self, semester=Semester.objects.get_active_sem(), position="Tutor").count()
-        return num_tutor_position > 0
-    
+        return "Tutor" in self.active_roles
+
     def is_gt(self) -> bool:
-        num_gt_position = StaffUserPosition.objects.filter(person=self, semester=Semester.objects.get_active_sem(), position="GT").count()
-        return num_gt_position > 0
-    
+        return "GT" in self.active_roles
+
     def is_ours_mentor(self) -> bool:
-        num_om_position = StaffUserPosition.objects.filter(person=self, semester=Semester.objects.get_active_sem(), position="OursM").count()
-        return num_om_position > 0
-    
+        return "OursM" in self.active_roles
+
     def is_pm(self) -> bool:
-        num_pm_position = StaffUserPosition.objects.filter(person=self, semester=Semester.objects.get_active_sem(), position="PM").count()
-        return num_pm_position > 0
+        return "PM" in self.active_roles
 
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name} [{self.email}]"
@@ -312,52 +387,109 @@ class ShiftManager(models.Manager):
     def filter(self, *args, **kwargs):
         return super().filter(*args, deleted=False, **kwargs)
 
+    # Bulk writes don't send model signals, so these do what the signal receivers would have: clear the rendered
+    # schedule and, for updates, bring the payroll ledger in line.
+
+    def bulk_create(self, *args, **kwargs):
+        shifts = super().bulk_create(*args, **kwargs)
+        bump_cache_version_on_commit(SCHEDULE)
+        return shifts
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # auto_now is only applied by save(), so modified_at is set here for the feeds' validators.
+        objs = list(objs)
+        now = timezone.now()
+        for shift in objs:
+            shift.modified_at = now
+        # Imported here because ledger imports this module.
+        from . import ledger
+
+        with transaction.atomic():
+            updated = super().bulk_update(objs, [*fields, "modified_at"], *args, **kwargs)
+            ledger.sync_shifts(shift.pk for shift in objs)
+        bump_cache_version_on_commit(SCHEDULE)
+        return updated
+
     def all_on_date(self, date):
-        tz_adjusted_range_start = datetime.datetime(
-            date.year, date.month, date.day, tzinfo=pytz.timezone("America/New_York")
-        )
-        tz_adjusted_range_end = tz_adjusted_range_start + datetime.timedelta(days=1)
-        return self.filter(
-            start__gte=tz_adjusted_range_start,
-            start__lte=tz_adjusted_range_end,
-        )
+        """
+        Shifts starting on date in local time. Filtering on a half-open range of the start column itself, rather than
+        on start__date or the like, lets the query seek on the index of live shifts' starts.
+        """
+
+        range_start = timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+        range_end = timezone.make_aware(datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time.min))
+        return self.filter(start__gte=range_start, start__lt=range_end)
+
+    def move_dates(self, moves):
+        """
+        Moves every shift on each date that is a key of moves onto the date it maps to, keeping its local start time.
+        The shifts are all read before any is moved, so two dates can be swapped by mapping each to the other. Returns
+        the moved shifts.
+        """
+
+        shifts = []
+        for from_date, to_date in moves.items():
+            for shift in self.all_on_date(from_date):
+                start = timezone.localtime(shift.start)
+                shift.start = timezone.make_aware(datetime.datetime.combine(to_date, start.time()))
+                shifts.append(shift)
+
+        with transaction.atomic():
+            self.bulk_update(shifts, ["start"], batch_size=500)
+        return shifts
 
     def add_class_shift(self, associated_postion, course):
-        sem = course.semester
-        
-        classes = ClassDetails.objects.filter(full_course=course).all()
-        holidays = Holidays.objects.filter(semester=sem).all()
-        day_switch = DaySwitch.objects.filter(semester=sem).all()
-        dates_of_switch = day_switch.values("date_of_switch")
-        day_to_follow = day_switch.values("day_to_follow")
-
-        shift_details = {
-            "position": associated_postion,
-            "kind": "Class"
-        }
-
-        for lecture in classes:
-            days_ahead = (lecture.class_day - sem.start_date.weekday()) % 7
-            class_date = sem.start_date + datetime.timedelta(days_ahead)
+        """
+        Puts every lecture of course for its semester on the schedule of associated_postion, and returns the created
+        shifts. Holidays and switched days are skipped, and a switched day gets the lectures of the day it follows.
+        """
 
-            shift_details["duration"] = lecture.class_duration
-            shift_details["location"] = lecture.location
-            shift_details["late_datetime"] = timezone.now()
+        sem = course.semester
 
-            while class_date <= sem.end_date:
-                if holidays.filter(date=class_date).exists() or dates_of_switch.filter(date_of_switch=class_date).exists():
-                    class_date += datetime.timedelta(7)
-                    continue
-                
-                shift_details["start"] = timezone.make_aware(datetime.datetime.combine(class_date, lecture.class_time))
-                self.create(**shift_details)
+        classes = list(ClassDetails.objects.filter(full_course=course))
+        skipped_dates = set(Holidays.objects.filter(semester=sem).values_list("date", flat=True))
+        day_switches = list(DaySwitch.objects.filter(semester=sem).values_list("date_of_switch", "day_to_follow"))
+        skipped_dates.update(date_of_switch for date_of_switch, _ in day_switches)
 
-                class_date += datetime.timedelta(7)
-            
-            for index, day in enumerate(day_to_follow):
-                if day["day_to_follow"] == lecture.class_day:
-                    shift_details["start"] = timezone.make_aware(datetime.datetime.combine(dates_of_switch[index]["date_of_switch"], lecture.class_time))
-                    self.create(**shift_details)
+        now = timezone.now()
+        shifts = []
+        for lecture in classes:
+            dates = list(weekly_dates(sem.start_date, sem.end_date, [lecture.class_day], skipped_dates))
+            dates += [date_of_switch for date_of_switch, day in day_switches if day == lecture.class_day]
+            for date in dates:
+                shifts.append(
+                    Shift(
+                        position=associated_postion,
+                        kind="Class",
+                        start=timezone.make_aware(datetime.datetime.combine(date, lecture.class_time)),
+                        duration=lecture.class_duration,
+                        location=lecture.location,
+                        late_datetime=now,
+                    )
+                )
+
+        with transaction.atomic():
+            return self.bulk_create(shifts)
+
+    def recurring_shifts(self, position, first_date, last_date, weekdays, start_time, **shift_details):
+        """
+        Builds, without saving, a shift for position at start_time on each of weekdays (Monday is 0) from first_date
+        to last_date, leaving out the holidays of its semester. Pass them to bulk_create() to add them.
+        """
+
+        holidays = set(
+            Holidays.objects.filter(semester=position.semester, date__range=(first_date, last_date)).values_list(
+                "date", flat=True
+            )
+        )
+        return [
+            Shift(
+                position=position,
+                start=timezone.make_aware(datetime.datetime.combine(date, start_time)),
+                **shift_details,
+            )
+            for date in weekly_dates(first_date, last_date, weekdays, holidays)
+        ]
 
 
 class Shift(models.Model):
@@ -424,15 +556,146 @@ class Shift(models.Model):
         null=False
     )
 
+    modified_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When the shift was last changed. Feeds use it to tell calendars whether they need to reload."
+    )
+
     objects = ShiftManager()
 
     class Meta:
         ordering = ('start',)
+        indexes = [
+            # ShiftManager leaves out deleted shifts, so its date ranges seek on this rather than a (deleted, start)
+            # index: the "NOT deleted" Django writes for deleted=False can't be used to seek on a leading column.
+            models.Index(fields=["start"], condition=Q(deleted=False), name="main_shift_live_start_idx"),
+            models.Index(fields=["position", "start"]),
+        ]
 
     def __str__(self):
         return f"{self.kind}, {self.location}"
 
 
+class PayrollLedger(models.Model):
+    """
+    Payroll figures for one signed and attended shift, precomputed so that payroll pages and exports don't have to
+    walk the shift table. Rows are written and corrected by signals.py as shifts change (see ledger.py) and can be
+    reconciled against Shift with the rebuildpayrollledger command.
+    """
+
+    shift = models.OneToOneField(
+        to=Shift,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ledger_entry",
+    )
+
+    person = models.ForeignKey(
+        to=LRCDatabaseUser,
+        on_delete=models.CASCADE,
+        related_name="payroll_ledger",
+    )
+
+    position = models.ForeignKey(
+        to=StaffUserPosition,
+        on_delete=models.CASCADE,
+        related_name="payroll_ledger",
+    )
+
+    start = models.DateTimeField()
+
+    week_start = models.DateField(help_text="Sunday of the week the shift starts in, local time.")
+
+    weekday = models.PositiveSmallIntegerField(help_text="Day of the week the shift starts on, 0 being Sunday.")
+
+    hours = models.DecimalField(decimal_places=2, max_digits=6)
+
+    pay = models.DecimalField(decimal_places=2, max_digits=8)
+
+    kind = models.CharField(max_length=14)
+
+    late = models.BooleanField(default=False)
+
+    late_datetime = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('start',)
+        indexes = [
+            models.Index(fields=["person", "start"]),
+            models.Index(fields=["start"]),
+        ]
+
+
+class ShiftChangeRequestManager(models.Manager):
+    def for_table(self):
+        """
+        Requests with just what includes/shift_change_request_table.html shows of them, the requester included, so
+        that a queue page costs one query however many rows it lists.
+        """
+
+        return self.select_related("new_position__person").only(
+            "state",
+            "is_drop_request",
+            "new_start",
+            "new_kind",
+            "reason",
+            "new_position__person__first_name",
+            "new_position__person__last_name",
+            "new_position__person__email",
+        )
+
+    def cached_alert_counts(self):
+        """
+        Alert counts from the cache, computed and stored on a miss. signals.py bumps their version stamp whenever a
+        request changes, so this is exact and costs no queries in the steady state. The key is read before counting,
+        so counts taken before a write can only land under the stamp that write retires.
+        """
+
+        key = versioned_key(ALERT_COUNTS)
+        counts = cache.get(key)
+        if counts is None:
+            counts = self.alert_counts()
+            cache.set(key, counts, shared_timeout(ALERT_COUNTS_TIMEOUT))
+        return counts
+
+    def rebuild_alert_counts(self):
+        bump_cache_version(ALERT_COUNTS)
+        return self.cached_alert_counts()
+
+    def alert_counts(self):
+        """
+        Counts the open requests behind every navbar alert badge. Each badge is a conditional count over the same
+        rows, so all of them come back from a single aggregate query.
+        """
+
+        def of_kind(kind, position):
+            return (
+                Q(new_kind=kind) | Q(new_position__position=position) | Q(shift_to_update__position__position=position)
+            )
+
+        si = of_kind("SI", "SI")
+        gt = of_kind("Group Tutoring", "GT")
+        tutoring = of_kind("Tutoring", "Tutoring")
+        om = of_kind("OURS Mentor", "OursM")
+
+        new_change = Q(is_drop_request=False, state="New")
+        pending_change = Q(is_drop_request=False, state="Pending")
+        new_drop = Q(is_drop_request=True, state="New")
+
+        return self.filter(state__in=("New", "Pending")).aggregate(
+            new_si_change_count=Count("pk", filter=si & new_change),
+            pending_si_change_count=Count("pk", filter=si & pending_change),
+            si_drop_count=Count("pk", filter=si & new_drop),
+            new_gt_change_count=Count("pk", filter=gt & new_change),
+            pending_gt_change_count=Count("pk", filter=gt & pending_change),
+            gt_drop_count=Count("pk", filter=gt & new_drop),
+            tutoring_change_count=Count("pk", filter=tutoring & new_change),
+            tutoring_drop_count=Count("pk", filter=tutoring & new_drop),
+            om_change_count=Count("pk", filter=om & new_change),
+            om_drop_count=Count("pk", filter=om & new_drop),
+        )
+
+
 class ShiftChangeRequest(models.Model):
     shift_to_update = models.ForeignKey(
         to=Shift,
@@ -508,8 +771,22 @@ class ShiftChangeRequest(models.Model):
         help_text="The kind of shift this is: tutoring or SI.",
     )
 
+    objects = ShiftChangeRequestManager()
+
     class Meta:
         ordering = ('new_start',)
+        indexes = [
+            # The request queues pick a state and list it in this order. is_drop_request is left out: Django filters it
+            # as "is_drop_request" or NOT "is_drop_request", which can't seek, and between the two it would stop the
+            # index from giving the order too.
+            models.Index(fields=["state", "new_start"]),
+            # Approved and denied requests are never purged, so the alert counts read only the open ones.
+            models.Index(
+                fields=["state", "is_drop_request"],
+                condition=Q(state__in=("New", "Pending")),
+                name="main_scr_open_state_idx",
+            ),
+        ]
 
 
 class Hardware(models.Model):
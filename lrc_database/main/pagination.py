@@ -0,0 +1,90 @@
+"""
+Keyset pagination for the shift change request queues. Rows are ordered by (new_start, id), with requests that have
+no new_start first, and a page is found from the last row of the one before it rather than by an offset, so every page
+is read from an index range however long the history behind it.
+"""
+
+import datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db.models import F, Q, QuerySet
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(change_request) -> str:
+    if change_request.new_start is None:
+        return f":{change_request.id}"
+    micros = (change_request.new_start - EPOCH) // datetime.timedelta(microseconds=1)
+    return f"{micros}:{change_request.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime.datetime], int]:
+    try:
+        micros, request_id = cursor.split(":")
+        new_start = None if micros == "" else EPOCH + datetime.timedelta(microseconds=int(micros))
+        return new_start, int(request_id)
+    except (ValueError, OverflowError):
+        raise BadRequest("Malformed page cursor.")
+
+
+# The row comparisons below are ORs, which SQLite can't turn into an index range by themselves. Each one also carries
+# the redundant bound new_start >= (or <=) the cursor, which it can seek on.
+
+
+def rows_after(new_start: Optional[datetime.datetime], request_id: int) -> Q:
+    if new_start is None:
+        return Q(new_start__isnull=True, id__gt=request_id) | Q(new_start__isnull=False)
+    return Q(new_start__gte=new_start) & (Q(new_start__gt=new_start) | Q(new_start=new_start, id__gt=request_id))
+
+
+def rows_before(new_start: Optional[datetime.datetime], request_id: int) -> Q:
+    # For a cursor with a new_start, this leaves out the rows without one, which come before all the others. An OR
+    # taking them in would stop the bound from being used, so keyset_page reads them separately when it needs them.
+    if new_start is None:
+        return Q(new_start__isnull=True, id__lt=request_id)
+    return Q(new_start__lte=new_start) & (Q(new_start__lt=new_start) | Q(new_start=new_start, id__lt=request_id))
+
+
+def get_page_size(params: Mapping[str, str]) -> int:
+    try:
+        size = int(params.get("size", settings.REQUEST_QUEUE_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("Page size must be a number.")
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(requests: QuerySet, params: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    One page of requests, picked by the "after" or "before" cursor in params (usually request.GET). Returns the rows
+    under change_requests, along with the cursors of the neighbouring pages, which are None where there is none.
+    """
+
+    size = get_page_size(params)
+    if "before" in params:
+        new_start, request_id = decode_cursor(params["before"])
+        descending = (F("new_start").desc(nulls_last=True), "-id")
+        rows = list(requests.filter(rows_before(new_start, request_id)).order_by(*descending)[: size + 1])
+        if new_start is not None and len(rows) <= size:
+            rows += requests.filter(new_start__isnull=True).order_by(*descending)[: size + 1 - len(rows)]
+        has_previous = len(rows) > size
+        rows = rows[:size][::-1]
+        has_next = True
+    else:
+        if "after" in params:
+            requests = requests.filter(rows_after(*decode_cursor(params["after"])))
+        rows = list(requests.order_by(F("new_start").asc(nulls_first=True), "id")[: size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = "after" in params
+
+    return {
+        "change_requests": rows,
+        "page_size": size,
+        "previous_cursor": encode_cursor(rows[0]) if rows and has_previous else None,
+        "next_cursor": encode_cursor(rows[-1]) if rows and has_next else None,
+    }
@@ -0,0 +1,18 @@
+import datetime
+from typing import AbstractSet, Iterable, Iterator
+
+
+def weekly_dates(
+    first: datetime.date, last: datetime.date, weekdays: Iterable[int], skip: AbstractSet[datetime.date] = frozenset()
+) -> Iterator[datetime.date]:
+    """
+    Every date from first to last, both included, that falls on one of weekdays (Monday is 0, as with
+    date.weekday()), in order and leaving out any date in skip.
+    """
+
+    weekdays = set(weekdays)
+    date = first
+    while date <= last:
+        if date.weekday() in weekdays and date not in skip:
+            yield date
+        date += datetime.timedelta(days=1)
@@ -0,0 +1,110 @@
+from typing import Iterable
+
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import ledger
+from .caching import ACTIVE_SEMESTER, ALERT_COUNTS, SCHEDULE, bump_cache_version_on_commit, user_groups_key
+from .models import (
+    Course,
+    FullCourse,
+    LRCDatabaseUser,
+    PayrollLedger,
+    Semester,
+    Shift,
+    ShiftChangeRequest,
+    StaffUserPosition,
+)
+
+
+@receiver(post_save, sender=ShiftChangeRequest)
+@receiver(post_delete, sender=ShiftChangeRequest)
+@receiver(post_save, sender=StaffUserPosition)
+@receiver(post_delete, sender=StaffUserPosition)
+@receiver(post_save, sender=Shift)
+def alert_source_changed(sender, **kwargs) -> None:
+    """
+    Every change of state (deny, make pending, approve, new drop or shift request) goes through a save, and the kind a
+    request is counted under depends on its positions, so any of these writes can move an alert count.
+    """
+
+    bump_cache_version_on_commit(ALERT_COUNTS)
+
+
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def semester_changed(sender, **kwargs) -> None:
+    # Covers change_active_semester and the admin.
+    bump_cache_version_on_commit(ACTIVE_SEMESTER)
+
+
+def invalidate_user_groups(user_ids: Iterable[int]) -> None:
+    for user_id in user_ids:
+        bump_cache_version_on_commit(user_groups_key(user_id))
+
+
+@receiver(m2m_changed, sender=LRCDatabaseUser.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    """
+    Fires for user.groups.add() and group.user_set.add() alike, so it covers create_user, create_users_in_bulk and
+    the admin. Clears are caught before they happen, while the affected users can still be looked up.
+    """
+
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_user_groups([instance.pk])
+    elif action == "pre_clear":
+        invalidate_user_groups(instance.user_set.values_list("pk", flat=True))
+    else:
+        invalidate_user_groups(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs) -> None:
+    # Renaming or deleting a group changes the names cached for all of its members.
+    invalidate_user_groups(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Shift)
+def shift_saved(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Keeps the payroll ledger in step with every shift save: sign_payroll marking a shift signed, the Preparation shift
+    it creates, approved change requests, drops and edits through the admin. Deleting a shift cascades to its row.
+    """
+
+    if not raw:
+        ledger.sync_shift(instance)
+
+
+@receiver(post_save, sender=StaffUserPosition)
+def position_saved(sender, instance, raw=False, **kwargs) -> None:
+    if not raw and PayrollLedger.objects.filter(position=instance).exists():
+        ledger.sync_position(instance)
+
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender=StaffUserPosition)
+@receiver(post_delete, sender=StaffUserPosition)
+@receiver(m2m_changed, sender=StaffUserPosition.tutor_courses.through)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=FullCourse)
+@receiver(post_delete, sender=FullCourse)
+def schedule_changed(sender, **kwargs) -> None:
+    """
+    The rendered schedule shows shifts under the courses their positions cover, with the course names and SI
+    faculty, so a write to any of these can change it. Bulk writes to shifts are handled by ShiftManager.
+    """
+
+    bump_cache_version_on_commit(SCHEDULE)
+
+
+@receiver(post_save, sender=LRCDatabaseUser)
+def user_saved(sender, update_fields=None, **kwargs) -> None:
+    # The schedule shows names and emails. Logging in saves last_login alone, which shouldn't clear it every time.
+    if update_fields is None or set(update_fields) != {"last_login"}:
+        bump_cache_version_on_commit(SCHEDULE)
@@ -8,7 +8,7 @@ register = template.Library()
 
 
 def is_in_groups(user: LRCDatabaseUser, *groups: str) -> bool:
-    return user.is_authenticated and user.groups.filter(name__in=groups).exists()
+    return user.is_authenticated and user.in_groups(*groups)
 
 
 @register.filter
@@ -1,17 +1,20 @@
 from django.template import Library
-from ..models import LRCDatabaseUser, StaffUserPosition, Semester
+from ..models import LRCDatabaseUser
 
 register = Library()
 
+# The filters below all read the user's active-semester positions from LRCDatabaseUser.active_positions, which loads
+# them (with their courses and peers) once per user instance.
+
 @register.filter(name='get_si_courses')
 def get_si_courses(user: LRCDatabaseUser):
-    active_position = StaffUserPosition.objects.filter(person=user, semester=Semester.objects.get_active_sem(), position="SI").all()
+    active_position = [pos for pos in user.active_positions if pos.position == "SI"]
     pos_list = [{'course_name':str(pos.si_course.course),'course_id':pos.si_course.id} for pos in active_position]
     return pos_list
 
 @register.filter(name='get_tutor_courses')
 def get_tutor_courses(user: LRCDatabaseUser):
-	active_position = StaffUserPosition.objects.filter(person=user, semester=Semester.objects.get_active_sem(), position="Tutor").all()
+	active_position = [pos for pos in user.active_positions if pos.position == "Tutor"]
 	pos_list = []
 	for pos in active_position:
 		for course in pos.tutor_courses.all():
@@ -20,7 +23,7 @@ def get_tutor_courses(user: LRCDatabaseUser):
 
 @register.filter(name='get_peers')
 def get_peers(user: LRCDatabaseUser):
-	active_position = StaffUserPosition.objects.filter(person=user, semester=Semester.objects.get_active_sem(), position="PM").all()
+	active_position = [pos for pos in user.active_positions if pos.position == "PM"]
 	peers = []
 	for pos in active_position:
 		for peer in pos.peers_list():
@@ -29,7 +32,7 @@ def get_peers(user: LRCDatabaseUser):
 
 @register.filter(name='positions')
 def positions(user: LRCDatabaseUser):
-	active_position = StaffUserPosition.objects.filter(person=user, semester=Semester.objects.get_active_sem()).all()
+	active_position = user.active_positions
 	positions = [] 
 	for pos in active_position:
 		if pos.position == "SI":
@@ -40,4 +43,4 @@ def positions(user: LRCDatabaseUser):
 		elif pos.position == "PM":
 			for peer in pos.peers.all():
 				positions.append(f"PM - {peer}")
-	return positions
\ No newline at end of file
+	return positions
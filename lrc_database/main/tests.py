@@ -1,3 +1,102 @@
-# from django.test import TestCase
+import datetime
+from typing import List
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import LRCDatabaseUser, Semester, Shift, ShiftChangeRequest, StaffUserPosition
+
+
+class ShiftChangeRequestQueryCountTests(TestCase):
+    """
+    The request queues and the single request page load everything they show with a fixed number of queries, however
+    many requests there are. The cache is cleared before each render so that every one starts equally cold.
+    """
+
+    office: LRCDatabaseUser
+    positions: List[StaffUserPosition]
+    shifts: List[Shift]
+
+    @classmethod
+    def setUpTestData(cls):
+        semester = Semester.objects.create(
+            name="FALL 2026", start_date=datetime.date(2026, 9, 2), end_date=datetime.date(2026, 12, 10), active=True
+        )
+        cls.office = LRCDatabaseUser.objects.create_user(
+            username="office", email="office@example.edu", first_name="Office", last_name="Staff"
+        )
+        cls.office.groups.add(Group.objects.create(name="Office staff"))
+
+        cls.positions = []
+        cls.shifts = []
+        for index, kind in enumerate(("SI", "Tutor", "GT")):
+            person = LRCDatabaseUser.objects.create_user(
+                username=f"staff{index}", email=f"staff{index}@example.edu", first_name="Staff", last_name=str(index)
+            )
+            position = StaffUserPosition.objects.create(person=person, semester=semester, position=kind, hourly_rate=15)
+            cls.positions.append(position)
+            cls.shifts.append(
+                Shift.objects.create(
+                    position=position,
+                    start=timezone.make_aware(datetime.datetime(2026, 9, 8, 10)),
+                    duration=datetime.timedelta(hours=1),
+                    location="GSMN 64",
+                    kind="Tutoring",
+                )
+            )
+
+    def add_requests(self, count: int) -> None:
+        start = timezone.make_aware(datetime.datetime(2026, 9, 9, 10))
+        ShiftChangeRequest.objects.bulk_create(
+            ShiftChangeRequest(
+                shift_to_update=self.shifts[index % len(self.shifts)],
+                new_position=self.positions[index % len(self.positions)],
+                new_start=start + datetime.timedelta(hours=index),
+                new_duration=datetime.timedelta(hours=1),
+                new_location="GSMN 64",
+                new_kind="Tutoring",
+                reason="Conflict",
+                state="New",
+                is_drop_request=index % 2 == 1,
+            )
+            for index in range(count)
+        )
+
+    def assert_fixed_queries(self, url: str, queries: int) -> None:
+        self.client.force_login(self.office)
+        rows = []
+        for count in (10, 20):
+            # 10 requests, then 30, both within one page.
+            self.add_requests(count)
+            cache.clear()
+            with self.subTest(url=url, requests=ShiftChangeRequest.objects.count()):
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+            rows.append(len(response.context["change_requests"]))
+        self.assertGreater(rows[0], 0)
+        self.assertGreater(rows[1], rows[0])
+
+    def test_change_request_queue(self):
+        self.assert_fixed_queries(reverse("view_shift_change_requests", args=("All", "New")), 6)
+
+    def test_change_request_queue_by_kind(self):
+        self.assert_fixed_queries(reverse("view_shift_change_requests", args=("SI", "New")), 6)
+
+    def test_drop_request_queue(self):
+        self.assert_fixed_queries(reverse("view_drop_shift_requests", args=("Tutor", "New")), 6)
+
+    def test_requests_by_user(self):
+        self.assert_fixed_queries(reverse("view_shift_change_requests_by_user", args=(self.positions[0].person_id,)), 7)
+
+    def test_single_request(self):
+        self.add_requests(1)
+        change_request = ShiftChangeRequest.objects.get()
+        self.client.force_login(self.office)
+        cache.clear()
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse("view_single_request", args=(change_request.id,)))
+        self.assertEqual(response.status_code, 200)
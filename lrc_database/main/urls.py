@@ -15,6 +15,7 @@ from .views.bulk_shift_editing_views import (
 )
 from .views.courses import (
     add_course, 
+    course_calendar,
     course_event_feed, 
     edit_course, 
     list_courses, 
@@ -47,6 +48,7 @@ from .views.users import (
     create_user, 
     create_users_in_bulk, 
     edit_profile, list_users, 
+    user_calendar,
     user_event_feed, 
     user_profile, 
     view_or_edit_user, 
@@ -61,7 +63,7 @@ from .views.semester import (
     delete_day_switch, 
     change_active_semester
 )
-from .views.payroll import sign_payroll, view_payroll, user_payroll, weekly_payroll
+from .views.payroll import sign_payroll, view_payroll, user_payroll, weekly_payroll, export_payroll
 from .views.pm import pm_schedule, pm_add_meeting
 from .views.auth import login_user, reset_password
 
@@ -85,6 +87,8 @@ ACCOUNTS_URLS: URLs = [
 API_URLS: URLs = [
     path("api/course_event_feed/<int:course_id>", course_event_feed, name="course_event_feed"),
     path("api/user_event_feed/<int:user_id>", user_event_feed, name="user_event_feed"),
+    path("api/calendar/course/<str:token>.ics", course_calendar, name="course_calendar"),
+    path("api/calendar/user/<str:token>.ics", user_calendar, name="user_calendar"),
 ]
 
 COURSES_URLS: URLs = [
@@ -166,6 +170,7 @@ PAYROLL_URL: URLs = [
     path("payroll/view", view_payroll, name="view_payroll"),
     path("payroll/user/<int:id>", user_payroll, name="user_payroll"),
     path("payroll/weekly/<negint:offset>", weekly_payroll, name="weekly_payroll"),
+    path("payroll/export/<str:name>", export_payroll, name="export_payroll"),
 ]
 
 PM_URL: URLs = [
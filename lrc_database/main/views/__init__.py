@@ -6,7 +6,8 @@ from django.contrib.auth.views import redirect_to_login
 from django.core.exceptions import PermissionDenied
 from django.db.models import Model, Q
 from django.forms import ModelForm
-from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed
+from django.http import HttpRequest, HttpResponseNotAllowed
+from django.http.response import HttpResponseBase
 from django.shortcuts import redirect, render
 
 from ..models import ShiftChangeRequest
@@ -18,15 +19,15 @@ User = get_user_model()
 def restrict_to_groups(
     *groups: str,
 ) -> Callable[
-    [Callable[Concatenate[HttpRequest, P], HttpResponse]], Callable[Concatenate[HttpRequest, P], HttpResponse]
+    [Callable[Concatenate[HttpRequest, P], HttpResponseBase]], Callable[Concatenate[HttpRequest, P], HttpResponseBase]
 ]:
     def decorator(
-        view: Callable[Concatenate[HttpRequest, P], HttpResponse]
-    ) -> Callable[Concatenate[HttpRequest, P], HttpResponse]:
-        def _wrapped_view(request: HttpRequest, *args: P.args, **kwargs: P.kwargs) -> HttpResponse:
+        view: Callable[Concatenate[HttpRequest, P], HttpResponseBase]
+    ) -> Callable[Concatenate[HttpRequest, P], HttpResponseBase]:
+        def _wrapped_view(request: HttpRequest, *args: P.args, **kwargs: P.kwargs) -> HttpResponseBase:
             if not request.user.is_authenticated:
                 return redirect_to_login(request.get_full_path())
-            if request.user.is_superuser or request.user.groups.filter(name__in=groups).exists():
+            if request.user.is_superuser or request.user.in_groups(*groups):
                 return view(request, *args, **kwargs)
             raise PermissionDenied
 
@@ -38,7 +39,7 @@ def restrict_to_groups(
 def restrict_to_http_methods(
     *methods: str,
 ) -> Callable[
-    [Callable[Concatenate[HttpRequest, P], HttpResponse]], Callable[Concatenate[HttpRequest, P], HttpResponse]
+    [Callable[Concatenate[HttpRequest, P], HttpResponseBase]], Callable[Concatenate[HttpRequest, P], HttpResponseBase]
 ]:
     """
     Annotation for views that only work with one HTTP method. If a request is made for the view with an acceptable
@@ -47,8 +48,8 @@ def restrict_to_http_methods(
     """
 
     def decorator(
-        view: Callable[Concatenate[HttpRequest, P], HttpResponse]
-    ) -> Callable[Concatenate[HttpRequest, P], HttpResponse]:
+        view: Callable[Concatenate[HttpRequest, P], HttpResponseBase]
+    ) -> Callable[Concatenate[HttpRequest, P], HttpResponseBase]:
         def _wrapped_view(request: HttpRequest, *args: P.args, **kwargs: P.kwargs):
             if request.method in methods:
                 return view(request, *args, **kwargs)
@@ -61,8 +62,8 @@ def restrict_to_http_methods(
 
 
 def personal(
-    view: Callable[Concatenate[HttpRequest, int, P], HttpResponse]
-) -> Callable[Concatenate[HttpRequest, int, P], HttpResponse]:
+    view: Callable[Concatenate[HttpRequest, int, P], HttpResponseBase]
+) -> Callable[Concatenate[HttpRequest, int, P], HttpResponseBase]:
     """
     Annotation for views that are "personal" to some user, meaning they should only be viewable to that user and
     privileged users.
@@ -81,7 +82,7 @@ def personal(
 @login_required
 def index(request):
     
-    if request.user.groups.filter(name=("Staff")).exists():
+    if request.user.in_groups("Staff"):
         
         return redirect("user_profile", request.user.id)
 
@@ -1,6 +1,5 @@
-from datetime import date, datetime
+from datetime import date
 
-import pytz
 from django import forms
 from django.contrib import messages
 from django.core.exceptions import BadRequest
@@ -34,7 +33,7 @@ def drop_shifts_on_date_confirmation(request: HttpRequest) -> HttpResponse:
             messages.add_message(request, messages.ERROR, f"Form has errors: {form.errors}")
             return redirect("drop_shifts_on_date")
         date = form.cleaned_data["date"]
-        shifts = Shift.objects.filter(start__year=date.year, start__month=date.month, start__day=date.day)
+        shifts = Shift.objects.all_on_date(date)
         request.session["shift_keys"] = list(shifts.values_list("id", flat=True))
         return render(request, "shifts/drop_shifts_on_date_confirmation.html", {"affected_shifts": shifts})
     else:
@@ -92,32 +91,9 @@ def swap_shift_dates_confirmation(request: HttpRequest) -> HttpResponse:
         first_date = date.fromisoformat(request.GET["first"])
         second_date = date.fromisoformat(request.GET["second"])
 
-        first_date_shifts = Shift.objects.all_on_date(first_date)
-        second_date_shifts = Shift.objects.all_on_date(second_date)
+        swapped_count = len(Shift.objects.move_dates({first_date: second_date, second_date: first_date}))
 
-        for shift in first_date_shifts:
-            start = shift.start.astimezone(pytz.timezone("America/New_York"))
-            start = start.replace(
-                year=second_date.year,
-                month=second_date.month,
-                day=second_date.day,
-            )
-            shift.start = start
-            shift.save()
-
-        for shift in second_date_shifts:
-            start = shift.start.astimezone(pytz.timezone("America/New_York"))
-            start = start.replace(
-                year=first_date.year,
-                month=first_date.month,
-                day=first_date.day,
-            )
-            shift.start = start
-            shift.save()
-
-        messages.add_message(
-            request, messages.INFO, f"Swapped dates for {(first_date_shifts | second_date_shifts).count()} shifts."
-        )
+        messages.add_message(request, messages.INFO, f"Swapped dates for {swapped_count} shifts.")
         return redirect("swap_shift_dates")
 
 
@@ -160,18 +136,7 @@ def move_shifts_from_date_confirmation(request: HttpRequest) -> HttpResponse:
     else:  # request.method == "GET"
         from_date = date.fromisoformat(request.GET["from"])
         to_date = date.fromisoformat(request.GET["to"])
-        from_date_shifts = Shift.objects.all_on_date(from_date)
-        for shift in from_date_shifts:
-            start = shift.start.astimezone(pytz.timezone("America/New_York"))
-            start = start.replace(
-                year=to_date.year,
-                month=to_date.month,
-                day=to_date.day,
-            )
-            shift.start = start
-            shift.save()
-
-        messages.add_message(
-            request, messages.INFO, f"Moved {from_date_shifts.count()} shifts from {from_date} to {to_date}."
-        )
+        moved_count = len(Shift.objects.move_dates({from_date: to_date}))
+
+        messages.add_message(request, messages.INFO, f"Moved {moved_count} shifts from {from_date} to {to_date}.")
         return redirect("move_shifts_from_date")
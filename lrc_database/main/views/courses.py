@@ -1,21 +1,45 @@
 from datetime import datetime
-from typing import Any, Dict
 
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import BadRequest
 from django.db.models import Q
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.http import Http404, HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
 from ..forms import CourseForm, SemesterSelectForm, FullCourseForm, ReadOnlyFullCourseForm, ClassDetailsForm, AddCoursesInBulkForm
+from ..conditional import conditional_response, shifts_validator
+from ..feeds import calendar_response, events_response, get_calendar_pk, get_calendar_token, get_shift_url_prefix
 from ..models import Course, Shift, Semester, FullCourse, StaffUserPosition, ClassDetails
 from . import restrict_to_groups, restrict_to_http_methods
 
 User = get_user_model()
 
+# The course calendar has its own colors, which differ from color_coder's for some kinds.
+COURSE_FEED_COLORS = {
+    "SI": "orange",
+    "Tutoring": "green",
+    "Training": "red",
+    "Observation": "blue",
+    "Class": "magenta",
+    "SI-Preparation": "teal",
+}
+
+
+def course_shifts(course: Course):
+    # Tutors are matched through a subquery rather than by joining tutor_courses, which repeated a shift once for
+    # every row the join matched.
+    return Shift.objects.filter(
+        Q(position__si_course__course=course) | Q(position__in=StaffUserPosition.objects.filter(tutor_courses=course))
+    )
+
+
+def course_feed_color(kind: str) -> str:
+    return COURSE_FEED_COLORS.get(kind, "black")
+
 
 @login_required
 @restrict_to_http_methods("GET")
@@ -33,7 +57,12 @@ def view_course(request: HttpRequest, course_id: int) -> HttpResponse:
     return render(
         request,
         "courses/view_course.html",
-        {"course": course, "tutors": tutors, "sis": sis},
+        {
+            "course": course,
+            "tutors": tutors,
+            "sis": sis,
+            "calendar_url": reverse("course_calendar", args=(get_calendar_token("course", course.id),)),
+        },
     )
 
 
@@ -204,7 +233,7 @@ def edit_course(request: HttpRequest, course_id: int) -> HttpResponse:
 
 @login_required
 @restrict_to_http_methods("GET")
-def course_event_feed(request: HttpRequest, course_id: int) -> JsonResponse:
+def course_event_feed(request: HttpRequest, course_id: int) -> HttpResponseBase:
     try:
         start = datetime.fromisoformat(request.GET["start"])
         end = datetime.fromisoformat(request.GET["end"])
@@ -215,36 +244,31 @@ def course_event_feed(request: HttpRequest, course_id: int) -> JsonResponse:
 
     course = get_object_or_404(Course, id=course_id)
 
-    # TODO: problematic, see comment on user_event_feed
-    shifts = Shift.objects.filter(
-        Q(position__si_course__course=course) | Q(position__tutor_courses__in=(course,)),
-        start__gte=start,
-        start__lte=end,
+    shifts = course_shifts(course).filter(start__gte=start, start__lte=end)
+
+    etag = shifts_validator(shifts)
+    return conditional_response(
+        request, lambda: events_response(shifts, course_feed_color), etag
     )
 
-    def to_json(shift: Shift) -> Dict[str, Any]:
-        color = "black"
-        if shift.kind == "SI":
-            color = "orange"
-        elif shift.kind == "Tutoring":
-            color = "green"
-        elif shift.kind == "Training":
-            color = "red"
-        elif shift.kind == "Observation":
-            color = "blue"
-        elif shift.kind == "Class":
-            color = "magenta"
-        elif shift.kind == "SI-Preparation":
-            color = "teal"
-        return {
-            "id": str(shift.id),
-            "start": shift.start.isoformat(),
-            "end": (shift.start + shift.duration).isoformat(),
-            "title": str(shift),
-            "allDay": False,
-            "url": reverse("view_shift", args=(shift.id,)),
-            "color": color,
-        }
-
-    json_response = list(map(to_json, shifts))
-    return JsonResponse(json_response, safe=False)
+
+@restrict_to_http_methods("GET")
+def course_calendar(request: HttpRequest, token: str) -> HttpResponseBase:
+    """
+    The course's SI and tutoring shifts this semester as an .ics calendar to subscribe to, with the signed token in
+    the URL standing in for a session.
+    """
+
+    course_id = get_calendar_pk("course", token)
+    if course_id is None:
+        raise Http404
+    course = get_object_or_404(Course, id=course_id)
+    shifts = course_shifts(course).filter(position__semester=Semester.objects.get_active_sem()).order_by("start")
+    url_prefix = request.build_absolute_uri(get_shift_url_prefix())
+
+    etag = shifts_validator(shifts)
+    return conditional_response(
+        request,
+        lambda: calendar_response(shifts, f"{course} - LRC shifts", url_prefix),
+        etag,
+    )
@@ -1,28 +1,44 @@
 from datetime import datetime, timedelta
 import pytz
 import calendar
+import csv
+from typing import Any, Dict, Iterable, List, Tuple
 
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from django.shortcuts import get_list_or_404, get_object_or_404, redirect, render
 
 from ..templatetags.groups import is_privileged
 from . import restrict_to_groups, restrict_to_http_methods
 
-from ..models import Shift, Semester, StaffUserPosition
+from ..models import PayrollLedger, Shift, Semester, StaffUserPosition
 from ..forms import PayrollForm, SemesterSelectForm, UserSelectForm
 from ..color_coder import color_coder, get_color_coder_dict
+from ..ledger import export_rows, ledger_entry_for
 
 
 def get_week_from_date(date):
-    start_week = date.replace(hour=0, minute=0)
+    start_week = date.replace(hour=0, minute=0, second=0, microsecond=0)
     while start_week.weekday() != 6:
         start_week -= timedelta(days=1)
     end_week = (start_week + timedelta(days=6)).replace(hour=23, minute=59, second=59)
     return start_week, end_week
 
+class Echo:
+    """
+    Stands in for a file for csv.writer, handing each formatted row straight back so it can be streamed.
+    """
+
+    def write(self, value):
+        return value
+
+def get_week_name(week_start):
+    week_end = week_start + timedelta(days=6)
+    return f"{week_start.month}/{week_start.day} - {week_end.month}/{week_end.day}"
+
 @login_required
 @restrict_to_http_methods("GET", "POST")
 def sign_payroll(request: HttpRequest) -> HttpResponse:
@@ -92,46 +108,49 @@ def sign_payroll(request: HttpRequest) -> HttpResponse:
 def get_user_payroll(user_id, semester):
     context = {"weeks":{}, "color_coder":get_color_coder_dict()}
 
-    shifts = Shift.objects.filter(position__semester=semester, position__person__id=user_id, attended=True, signed=True).all()
-    shifts = shifts.order_by("start")
-    positions = shifts.values_list('position').distinct()
+    # Hours, pay and the week each shift falls in are precomputed on the ledger, so one query over it (with what
+    # str(entry.position) needs) is enough to lay out the whole semester.
+    entries = list(
+        PayrollLedger.objects.filter(position__semester=semester, person__id=user_id)
+        .select_related("position__person", "position__si_course__course")
+        .order_by("start")
+    )
 
-    if shifts.count() == 0:
+    if len(entries) == 0:
         context["total_hours"] = "0.00"
         context["total_pay"] = "$0.00"
-    else:
-        context["total_hours"] = 0
-        context["total_pay"] = 0
-        start_week, end_week = get_week_from_date(shifts[0].start)
-        
-        remaining_shifts = shifts.filter(start__gte=start_week)
-
-        while remaining_shifts.count() != 0:
-            week_name = f"{start_week.month}/{start_week.day} - {end_week.month}/{end_week.day}"
-            position_wise_pay = {str(StaffUserPosition.objects.get(id=key[0])):[[],[],[],[],[],[],[],0,0] for key in positions}
-            for shift in remaining_shifts.filter(start__lte=end_week):
-                position = str(shift.position)
-                hours = round(shift.duration.seconds/3600,2)
-                pay = round(shift.duration.seconds/3600 * float(shift.position.hourly_rate),2)
-                position_wise_pay[position][(shift.start.weekday()+1)%7].append({
-                    "time": f"{hours:0.2f}",
-                    "id": shift.id,
-                    "color": f"bg-{color_coder(shift.kind)}",
-                    "late": shift.late
-                })
-                position_wise_pay[position][7] += hours
-                position_wise_pay[position][8] += pay
-                context["total_hours"] += hours
-                context["total_pay"] += pay
-            for position_pay in position_wise_pay.values():
-                position_pay[7] = f"{position_pay[7]:0.2f}"
-                position_pay[8] = f"${position_pay[8]:0.2f}"
-            context["weeks"][week_name] = position_wise_pay
-            start_week += timedelta(days=7)
-            end_week += timedelta(days=7)
-            remaining_shifts = remaining_shifts.filter(start__gte=start_week)
-        context["total_hours"] = f"{context['total_hours']:0.2f}"
-        context["total_pay"] = f"${context['total_pay']:0.2f}"
+        return context
+
+    # Every week lists every position worked this semester, in the order they were first worked.
+    positions = list(dict.fromkeys(str(entry.position) for entry in entries))
+    first_week_start = entries[0].week_start
+    week_count = (entries[-1].week_start - first_week_start).days // 7 + 1
+    weeks = [{position: [[],[],[],[],[],[],[],0,0] for position in positions} for _ in range(week_count)]
+
+    total_hours = 0
+    total_pay = 0
+    for entry in entries:
+        week = weeks[(entry.week_start - first_week_start).days // 7]
+        position_pay = week[str(entry.position)]
+        position_pay[entry.weekday].append({
+            "time": f"{entry.hours:0.2f}",
+            "id": entry.shift_id,
+            "color": f"bg-{color_coder(entry.kind)}",
+            "late": entry.late
+        })
+        position_pay[7] += entry.hours
+        position_pay[8] += entry.pay
+        total_hours += entry.hours
+        total_pay += entry.pay
+
+    for index, position_wise_pay in enumerate(weeks):
+        week_name = get_week_name(first_week_start + timedelta(days=7*index))
+        for position_pay in position_wise_pay.values():
+            position_pay[7] = f"{position_pay[7]:0.2f}"
+            position_pay[8] = f"${position_pay[8]:0.2f}"
+        context["weeks"][week_name] = position_wise_pay
+    context["total_hours"] = f"{total_hours:0.2f}"
+    context["total_pay"] = f"${total_pay:0.2f}"
     return context
 
 @login_required
@@ -188,76 +207,93 @@ def weekly_payroll(request: HttpRequest, offset: int) -> HttpResponse:
     if request.method == "POST":
         pass
     else:
-        context = {"offset":offset}
-        week_start, week_end = get_week_from_date(timezone.now() - timedelta(days=(7*offset)))
-        context["cur_week"] = f"{week_start.month}/{week_start.day} - {week_end.month}/{week_end.day}"
+        active_sem = Semester.objects.get_active_sem()
+        context: Dict[str, Any] = {"offset": offset, "active_sem": active_sem}
+        week_start, week_end = get_week_from_date(timezone.localtime() - timedelta(days=(7*offset)))
+        context["cur_week"] = get_week_name(week_start)
+
+        related = ("position__person", "position__si_course__course")
 
-        late_shifts = Shift.objects.filter(
+        # Signed shifts are read from the payroll ledger. Shifts that aren't signed yet have no ledger row, so theirs
+        # are built in memory the same way.
+        late_shifts = PayrollLedger.objects.filter(
             late=True, 
-            attended=True, 
-            signed=True, 
-            position__semester= Semester.objects.get_active_sem(), 
+            position__semester=active_sem, 
             late_datetime__gte=week_start, 
             late_datetime__lte=week_end
-        ).order_by("start")
+        ).select_related(*related).order_by("start")
 
-        shift_from_this_week = Shift.objects.filter(
-            position__semester=Semester.objects.get_active_sem(), 
+        on_time_shifts = PayrollLedger.objects.filter(
+            late=False,
+            position__semester=active_sem, 
             start__gte=week_start, 
             start__lte=week_end
-        ).order_by("position")
+        ).select_related(*related).order_by("position")
 
-        on_time_shifts = shift_from_this_week.filter(
-            attended=True,
-            late=False,  
-            signed=True
-        )
-
-        shifts_not_signed = shift_from_this_week.filter(
-            signed=False
-        )
+        shifts_not_signed = map(ledger_entry_for, Shift.objects.filter(
+            signed=False,
+            position__semester=active_sem, 
+            start__gte=week_start, 
+            start__lte=week_end
+        ).select_related(*related).order_by("position"))
 
-        shift_type_with_name = [
+        shift_type_with_name: List[Tuple[Iterable[PayrollLedger], str]] = [
             (late_shifts, "late_shifts"),
             (on_time_shifts, "cur_shifts"),
             (shifts_not_signed, "not_signed")
         ]
 
+        # One query per category. Each person's rows list every position they have shifts for in that category, in
+        # the order the query returns them, so those are collected before the hours are added up.
         for shift_type, shift_type_name in shift_type_with_name:
+            entries = list(shift_type)
+            person_positions: Dict[str, Dict[str, None]] = {}
+            for entry in entries:
+                person_positions.setdefault(str(entry.position.person), {})[str(entry.position)] = None
+
             info_shifts = {"Total_hours": 0, "Total_pay":0} if shift_type_name != "late_shifts" else {}
-            for shift in shift_type:
+            for entry in entries:
                 info = None
                 if shift_type_name == "late_shifts":
-                    week_start, week_end = get_week_from_date(shift.start)
-                    week_name = f"{week_start.month}/{week_start.day} - {week_end.month}/{week_end.day}"
+                    week_name = get_week_name(entry.week_start)
                     if week_name not in info_shifts:
                         info_shifts[week_name] = {"Total_hours": 0, "Total_pay":0}
                     info = info_shifts[week_name]
                 else:
                     info = info_shifts
-                person = str(shift.position.person)
+                person = str(entry.position.person)
                 if person not in info:
-                    info[person] = {}
-                    for pshift in shift_type.filter(position__person=shift.position.person).all():
-                        position = str(pshift.position)
-                        if position not in info[person]:
-                            info[person][position] = [0,0,0,0,0,0,0,0,0]
+                    info[person] = {position: [0,0,0,0,0,0,0,0,0] for position in person_positions[person]}
                     info[person]["Total"] = [0,0,0,0,0,0,0,0,0]
-                index = (shift.start.weekday()+1)%7
-                hours = round(shift.duration.seconds/3600,2)
-                pay = round(shift.duration.seconds/3600 * float(shift.position.hourly_rate),2)
+                position = str(entry.position)
+                index = entry.weekday
                 
-                info[person][position][index] += hours
-                info[person][position][7] += hours
-                info[person][position][8] += pay
+                info[person][position][index] += entry.hours
+                info[person][position][7] += entry.hours
+                info[person][position][8] += entry.pay
 
-                info[person]["Total"][index] += hours
-                info[person]["Total"][7] += hours
-                info[person]["Total"][8] += pay
+                info[person]["Total"][index] += entry.hours
+                info[person]["Total"][7] += entry.hours
+                info[person]["Total"][8] += entry.pay
 
-                info["Total_hours"] += hours
-                info["Total_pay"] += pay
+                info["Total_hours"] += entry.hours
+                info["Total_pay"] += entry.pay
 
             context[shift_type_name] = info_shifts
 
-        return render(request, "payroll/weekly_payroll.html", context)
\ No newline at end of file
+        return render(request, "payroll/weekly_payroll.html", context)
+
+
+@login_required
+@restrict_to_groups("Office staff", "Supervisors")
+@restrict_to_http_methods("GET")
+def export_payroll(request: HttpRequest, name: str) -> HttpResponseBase:
+    semester = get_object_or_404(Semester, name=name)
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in export_rows(semester)),
+        content_type="text/csv",
+    )
+    filename = f"payroll-{semester.name.replace(' ', '-')}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -1,60 +1,80 @@
-from datetime import datetime, timedelta
-from urllib import request
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
 
-import pytz
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.http import HttpRequest, HttpResponse
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils import timezone
 
-from ..models import Shift, Course, StaffUserPosition
+from ..caching import SCHEDULE, SCHEDULE_TIMEOUT, shared_timeout, versioned_key
+from ..models import Course, Shift
 from . import restrict_to_groups, restrict_to_http_methods
 
-timezone = pytz.timezone("America/New_York")
-User = get_user_model()
+
+def get_schedule_grid(kind: str, start: date) -> dict:
+    """
+    The week of shifts from the local date start, as {course short name: [course id, [shifts on each of the 7 days]]}.
+    Only courses with a shift that week get a row, in the usual course order. SI shifts go under their SI course and
+    every other shift under each course its position tutors.
+    """
+
+    range_start = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+    range_end = timezone.make_aware(datetime.combine(start + timedelta(days=7), datetime.min.time()))
+    shifts = (
+        Shift.objects.filter(start__gte=range_start, start__lt=range_end)
+        .select_related("position__person", "position__si_course__course")
+        .prefetch_related("position__tutor_courses")
+    )
+
+    rows: Dict[int, Tuple[Course, List[List[Shift]]]] = {}
+    for shift in shifts:
+        if shift.kind == "SI" and (kind == "SI" or kind == "All"):
+            courses = [shift.position.si_course.course]
+        elif kind == "Tutoring" or kind == "All":
+            courses = shift.position.tutor_courses.all()
+        else:
+            continue
+        day = (timezone.localtime(shift.start).date() - start).days
+        for course in courses:
+            if course.id not in rows:
+                rows[course.id] = (course, [[], [], [], [], [], [], []])
+            rows[course.id][1][day].append(shift)
+
+    info = {}
+    for course, days in sorted(rows.values(), key=lambda row: (row[0].department, row[0].number)):
+        info[course.short_name()] = [course.id, days]
+    return info
 
 
 @login_required
 @restrict_to_http_methods("GET")
 # @restrict_to_groups("Office staff", "Supervisors")
 def view_schedule(request: HttpRequest, kind: str, offset: str) -> HttpResponse:
-    user = get_object_or_404(User, id=request.user.id)
-    privileged = user.is_privileged()
+    privileged = request.user.is_privileged()
     offset = int(offset) if privileged else -7
-    
-    today = timezone.localize(datetime.combine(datetime.today(), datetime.min.time()))
-    start = today + timedelta(days=offset)
-    end = start + timedelta(days=7)
 
-    shifts = Shift.objects.filter(start__gte=start.isoformat(), start__lte=end)
+    start = timezone.localdate() + timedelta(days=offset)
 
     weekdays = [start + i * timedelta(days=1) for i in range(7)]
 
-    info = {}
-
-    courses = Course.objects.all()
+    # Everyone who isn't privileged sees the same week, so the rendered grid is shared between viewers. It is stored
+    # under the schedule's version stamp, which signals.py and ShiftManager bump on every write it depends on.
+    key = versioned_key(SCHEDULE, kind, start.isoformat(), privileged)
 
-    for course in courses:
-        info[course.short_name()] = [course.id, [[], [], [], [], [], [], []]]
-
-    start_day = start.weekday()
-
-    for shift in shifts:
-        s_kind = shift.kind
-        s_position = shift.position
-        if s_kind == "SI" and (kind == "SI" or kind == "All"):
-            s_course = s_position.si_course.course.short_name()
-            info[s_course][1][(shift.start.weekday()-start_day)%7].append(shift)
-        elif kind == "Tutoring" or kind == "All":
-            for course in s_position.tutor_courses.all():
-                info[course.short_name()][1][(shift.start.weekday()-start_day)%7].append(shift)
+    grid = cache.get(key)
+    if grid is None:
+        grid = render_to_string(
+            "includes/schedule_grid.html",
+            {"privileged": privileged, "weekdays": weekdays, "info": get_schedule_grid(kind, start)},
+        )
+        cache.set(key, grid, shared_timeout(SCHEDULE_TIMEOUT))
 
     context = {
         "privileged": privileged, 
         "kind": kind, 
         "offset": offset, 
-        "weekdays": weekdays, 
-        "info": info
+        "grid": grid
     }
-
     return render(request, "schedule/schedule_view.html", context)
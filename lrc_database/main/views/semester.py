@@ -10,6 +10,7 @@ from django.core.exceptions import BadRequest, PermissionDenied
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_list_or_404, get_object_or_404, redirect, render
 from django.urls import reverse
+from django.db import transaction
 from django.db.models import Q
 
 from ..forms import DaySwitchForm, HolidaysForm, SemesterForm, ReadOnlySemesterForm
@@ -30,19 +31,21 @@ def list_semesters(request: HttpRequest) -> HttpResponse:
 def change_active_semester(request: HttpRequest, name: str) -> HttpResponse:
 	active_semester = Semester.objects.get_active_sem()
 
-	if active_semester is None:
-		sem = Semester.objects.filter(name=name).first()
-		sem.active = True
-		sem.save()
-	elif active_semester.name == name:
-		active_semester.active = False
-		active_semester.save()
-	else:
-		active_semester.active = False
-		sem = Semester.objects.filter(name=name).first()
-		sem.active = True
-		active_semester.save()
-		sem.save()
+	# One transaction, so the cached active semester is invalidated once both saves are visible.
+	with transaction.atomic():
+		if active_semester is None:
+			sem = Semester.objects.filter(name=name).first()
+			sem.active = True
+			sem.save()
+		elif active_semester.name == name:
+			active_semester.active = False
+			active_semester.save()
+		else:
+			active_semester.active = False
+			sem = Semester.objects.filter(name=name).first()
+			sem.active = True
+			active_semester.save()
+			sem.save()
 
 	return redirect("list_semesters")
 
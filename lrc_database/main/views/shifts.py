@@ -1,12 +1,13 @@
-from datetime import datetime, timedelta
+from typing import Any, Dict
 
 from django.contrib import messages
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.db.models import Q
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_list_or_404, get_object_or_404, redirect, render
 from django.urls import reverse
 
@@ -19,6 +20,7 @@ from ..forms import (
     NewShiftRecurringForm
 )
 from ..models import Shift, ShiftChangeRequest
+from ..pagination import keyset_page
 from ..templatetags.groups import is_privileged
 from . import restrict_to_groups, restrict_to_http_methods
 
@@ -29,7 +31,7 @@ User = get_user_model()
 @restrict_to_http_methods("GET")
 def view_shift(request: HttpRequest, shift_id: int) -> HttpResponse:
     shift = get_object_or_404(Shift, pk=shift_id)
-    change_requests = ShiftChangeRequest.objects.filter(shift_to_update=shift)
+    change_requests = ShiftChangeRequest.objects.for_table().filter(shift_to_update=shift)
     return render(
         request,
         "shifts/view_shift.html",
@@ -79,28 +81,55 @@ def new_shift_change_request(request: HttpRequest, shift_id: int) -> HttpRespons
         )
 
 
+def render_request_queue(request: HttpRequest, requests, context: Dict[str, Any]) -> HttpResponse:
+    """
+    Renders one page of a request queue (see pagination.py). With ?format=json the page is returned as JSON instead,
+    for loading further pages into one that is already open.
+    """
+
+    context.update(keyset_page(requests, request.GET))
+    if request.GET.get("format") != "json":
+        return render(request, "scheduling/view_shift_change_requests.html", context)
+
+    def to_json(change_request: ShiftChangeRequest) -> Dict[str, Any]:
+        return {
+            "id": change_request.id,
+            "url": reverse("view_single_request", args=(change_request.id,)),
+            "person": str(change_request.new_position.person) if change_request.new_position else None,
+            "kind": change_request.new_kind,
+            "state": change_request.state,
+            "is_drop_request": change_request.is_drop_request,
+            "new_start": change_request.new_start.isoformat() if change_request.new_start else None,
+            "reason": change_request.reason,
+        }
+
+    return JsonResponse(
+        {
+            "requests": [to_json(change_request) for change_request in context["change_requests"]],
+            "previous": context["previous_cursor"],
+            "next": context["next_cursor"],
+        }
+    )
+
+
 # View all NEW requests
 @restrict_to_groups("Office staff", "Supervisors")
 @restrict_to_http_methods("GET")
 def view_shift_change_requests(request: HttpRequest, kind: str, state: str) -> HttpResponse:
     if kind == "All":
-        requests = ShiftChangeRequest.objects.filter(state=state)
+        requests = ShiftChangeRequest.objects.for_table().filter(state=state)
     else:
         if kind != "Other":
-            requests = ShiftChangeRequest.objects.filter(
+            requests = ShiftChangeRequest.objects.for_table().filter(
                 (Q(new_position__position=kind) | Q(shift_to_update__position__position=kind)), state=state, is_drop_request=False
             )
         else:
-            requests = ShiftChangeRequest.objects.filter(
+            requests = ShiftChangeRequest.objects.for_table().filter(
                 ~(Q(new_position__position__in=["SI","Tutor","GT","OursM"]) | Q(shift_to_update__position__position__in=["SI","Tutor","GT","OursM"])), 
                 state=state, is_drop_request=False
             )
     kind = "Group-Tutor" if kind == "GT" else ("OURS Mentor" if kind == "OursM" else kind)
-    return render(
-        request,
-        "scheduling/view_shift_change_requests.html",
-        {"change_requests": requests, "kind": kind, "state": state, "drop": False, "previlaged": True},
-    )
+    return render_request_queue(request, requests, {"kind": kind, "state": state, "drop": False, "previlaged": True})
 
 
 @restrict_to_groups("Office staff", "Supervisors")
@@ -108,20 +137,16 @@ def view_shift_change_requests(request: HttpRequest, kind: str, state: str) -> H
 def view_drop_shift_requests(request: HttpRequest, kind: str, state: str) -> HttpResponse:
     requests = None
     if kind != "Other":
-        requests = ShiftChangeRequest.objects.filter(
+        requests = ShiftChangeRequest.objects.for_table().filter(
             (Q(new_position__position=kind) | Q(shift_to_update__position__position=kind)), state=state, is_drop_request=True
         )
     else:
-        requests = ShiftChangeRequest.objects.filter(
+        requests = ShiftChangeRequest.objects.for_table().filter(
             ~(Q(new_position__position__in=["SI","Tutor","GT","OursM"]) | Q(shift_to_update__position__position__in=["SI","Tutor","GT","OursM"])), 
             state=state, is_drop_request=True
         )
     kind = "Group-Tutor" if kind == "GT" else ("OURS Mentor" if kind == "OursM" else kind)
-    return render(
-        request,
-        "scheduling/view_shift_change_requests.html",
-        {"change_requests": requests, "kind": kind, "state": state, "drop": True, "previlaged": True},
-    )
+    return render_request_queue(request, requests, {"kind": kind, "state": state, "drop": True, "previlaged": True})
 
 
 @login_required
@@ -129,21 +154,20 @@ def view_drop_shift_requests(request: HttpRequest, kind: str, state: str) -> Htt
 def view_shift_change_requests_by_user(request: HttpRequest, user_id: int) -> HttpResponse:
     if not is_privileged(request.user) and request.user.id != user_id:
         raise PermissionDenied
-    requests = ShiftChangeRequest.objects.filter(
+    requests = ShiftChangeRequest.objects.for_table().filter(
         (Q(new_position__person__id=user_id) | Q(shift_to_update__position__person__id=user_id)),
     )
     target_user = get_object_or_404(User, id=user_id)
-    return render(
-        request,
-        "scheduling/view_shift_change_requests.html",
-        {"change_requests": requests, "kind": f"{target_user.first_name}'s"},
-    )
+    return render_request_queue(request, requests, {"kind": f"{target_user.first_name}'s"})
 
 
 @login_required
 @restrict_to_http_methods("GET")
 def view_shift_change_request(request: HttpRequest, request_id: int) -> HttpResponse:
-    shift_request = get_object_or_404(ShiftChangeRequest, pk=request_id)
+    shift_request = get_object_or_404(
+        ShiftChangeRequest.objects.select_related("new_position__person", "shift_to_update__position__person"),
+        pk=request_id,
+    )
     is_for_user = False
     if shift_request.new_position.person == request.user:
         is_for_user = True
@@ -279,33 +303,31 @@ def new_shift_recurring(request: HttpRequest) -> HttpResponse:
         form = NewShiftRecurringForm(request.POST)
         if form.is_valid():
             data = form.cleaned_data
-            rec_start_date = data["recurring_start_date"]
-            rec_end_date = data["recurring_end_date"]
-            rec_day_of_week = int(data["recurring_day_of_week"])
-            diff = (rec_day_of_week - rec_start_date.weekday()) % 7
-            shift_time = data["shift_start_time"]
-            first_shift_date = rec_start_date + timedelta(days=diff)
-            first_shift = datetime.combine(first_shift_date, shift_time)
-
-            shift_data = {
-                'position': data["position"], 
-                'duration': data["duration"], 
-                'location': data["location"], 
-                'kind': data["kind"],
-                'late_datetime': timezone.now(),
-                'start': None
-            }
+            shifts = Shift.objects.recurring_shifts(
+                data["position"],
+                data["recurring_start_date"],
+                data["recurring_end_date"],
+                data["recurring_days_of_week"],
+                data["shift_start_time"],
+                duration=data["duration"],
+                location=data["location"],
+                kind=data["kind"],
+                late_datetime=timezone.now()
+            )
 
-            shift_start = first_shift
+            first_name = data["position"].person.first_name
+            if "preview" in request.POST:
+                messages.add_message(
+                    request, messages.INFO, f"This will add {len(shifts)} shifts for {first_name}, leaving out holidays."
+                )
+                return render(request, "shifts/new_shift_recurring.html", {"form": form})
 
-            while shift_start.date() <= rec_end_date:
-                shift_data["start"] = shift_start
-                final_shift = Shift(**shift_data)
-                final_shift.save()
-                shift_start += timedelta(days=7)
+            with transaction.atomic():
+                Shift.objects.bulk_create(shifts)
 
-            first_name = data["position"].person.first_name
-            messages.add_message(request, messages.SUCCESS, f"Succesfully added recuring shift for {first_name}.")
+            messages.add_message(
+                request, messages.SUCCESS, f"Successfully added {len(shifts)} recurring shifts for {first_name}."
+            )
             return redirect("new_shift_recurring")
         else:
             messages.add_message(request, messages.ERROR, f"Form errors: {form.errors}")
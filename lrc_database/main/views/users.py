@@ -1,4 +1,3 @@
-import json
 from datetime import datetime
 from typing import Any, Dict, Optional
 
@@ -7,15 +6,20 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import Group
 from django.core.exceptions import BadRequest, PermissionDenied
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.http import Http404, HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
 from django.shortcuts import get_list_or_404, get_object_or_404, redirect, render
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef, Q
 from django.urls import reverse
-from django.db.models import Q
 
 from ..forms import CreateUserForm, CreateUsersInBulkForm, EditProfileForm, StaffUserPositionForm, EditUserForm
-from ..models import LRCDatabaseUser, Semester, Shift, StaffUserPosition, Course
+from ..models import LRCDatabaseUser, Semester, Shift, StaffUserPosition
 from . import personal, restrict_to_groups, restrict_to_http_methods
 from ..color_coder import color_coder
+from ..conditional import conditional_response, shifts_validator
+from ..feeds import calendar_response, events_response, get_calendar_pk, get_calendar_token, get_shift_url_prefix
 
 User = get_user_model()
 
@@ -23,35 +27,21 @@ User = get_user_model()
 @login_required
 @restrict_to_http_methods("GET")
 def user_profile(request: HttpRequest, user_id: int) -> HttpResponse:
-    target_user = get_object_or_404(User, id=user_id)
-    active_positions = StaffUserPosition.objects.filter(person=target_user, semester=Semester.objects.get_active_sem())
-    target_users_shifts = json.dumps(
-        list(
-            map(
-                lambda shift: {
-                    "id": str(shift.id),
-                    "start": shift.start.isoformat(),
-                    "end": (shift.start + shift.duration).isoformat(),
-                    "title": str(shift),
-                    "allDay": False,
-                    "url": reverse("view_shift", args=(shift.id,)),
-                },
-                Shift.objects.filter(position__in=active_positions),
-            )
-        )
-    )
+    # On one's own profile, request.user already has the positions the navbar read, so the page reuses them.
+    target_user = request.user if request.user.id == user_id else get_object_or_404(User, id=user_id)
 
-    return render(
-        request,
-        "users/user_profile.html",
-        {"target_user": target_user, "target_users_shifts": target_users_shifts},
-    )
+    # The calendar loads the shifts it shows from user_event_feed, one visible range at a time. The subscription
+    # link can't be taken back once shared, so it is only shown to the people who can already see the shifts.
+    context: Dict[str, Any] = {"target_user": target_user}
+    if request.user.id == target_user.id or request.user.is_privileged():
+        context["calendar_url"] = reverse("user_calendar", args=(get_calendar_token("user", target_user.id),))
+    return render(request, "users/user_profile.html", context)
 
 
 @login_required
 @personal
 @restrict_to_http_methods("GET")
-def user_event_feed(request: HttpRequest, user_id: int) -> HttpResponse:
+def user_event_feed(request: HttpRequest, user_id: int) -> HttpResponseBase:
     try:
         start = datetime.fromisoformat(request.GET["start"])
         end = datetime.fromisoformat(request.GET["end"])
@@ -64,19 +54,34 @@ def user_event_feed(request: HttpRequest, user_id: int) -> HttpResponse:
     active_positions = StaffUserPosition.objects.filter(person=user, semester=Semester.objects.get_active_sem())
     shifts = Shift.objects.filter(position__in=active_positions, start__gte=start, start__lte=end)
 
-    def to_json(shift: Shift) -> Dict[str, Any]:
-        return {
-            "id": str(shift.id),
-            "start": shift.start.isoformat(),
-            "end": (shift.start + shift.duration).isoformat(),
-            "title": str(shift),
-            "allDay": False,
-            "url": reverse("view_shift", args=(shift.id,)),
-            "color": color_coder(shift.kind),
-        }
+    etag = shifts_validator(shifts)
+    return conditional_response(
+        request, lambda: events_response(shifts, color_coder), etag
+    )
+
+
+@restrict_to_http_methods("GET")
+def user_calendar(request: HttpRequest, token: str) -> HttpResponseBase:
+    """
+    The user's shifts this semester as an .ics calendar to subscribe to. Calendar apps can't log in, so the signed
+    token in the URL stands in for the session.
+    """
 
-    json_response = list(map(to_json, shifts))
-    return JsonResponse(json_response, safe=False)
+    user_id = get_calendar_pk("user", token)
+    if user_id is None:
+        raise Http404
+    user = get_object_or_404(User, id=user_id)
+    shifts = Shift.objects.filter(
+        position__person=user, position__semester=Semester.objects.get_active_sem()
+    ).order_by("start")
+    url_prefix = request.build_absolute_uri(get_shift_url_prefix())
+
+    etag = shifts_validator(shifts)
+    return conditional_response(
+        request,
+        lambda: calendar_response(shifts, f"{user.first_name} {user.last_name} - LRC shifts", url_prefix),
+        etag,
+    )
 
 
 @login_required
@@ -177,25 +182,39 @@ def create_users_in_bulk(request: HttpRequest) -> HttpResponse:
 @restrict_to_groups("Office staff", "Supervisors")
 @restrict_to_http_methods("GET")
 def list_users(request: HttpRequest, group: Optional[str] = None) -> HttpResponse:
+    # The roles each user holds this semester are annotated onto the same query as EXISTS subqueries, so filtering by
+    # one and showing them all doesn't take a query per role or per user. Only the page shown is read, along with
+    # one more query for its users' groups. The annotations are named has_*, since is_si() and the like are methods.
+    active_positions = StaffUserPosition.objects.filter(
+        person=OuterRef("pk"), semester=Semester.objects.get_active_sem()
+    )
+    users = User.objects.annotate(
+        **{
+            f"has_{role.lower()}": Exists(active_positions.filter(position=role))
+            for role in ("SI", "Tutor", "PM", "GT", "OursM")
+        },
+        has_sst=Exists(active_positions.filter(position="Tutor", tutor_courses__department="STUDY-SKILL")),
+    )
     if group is not None:
         if group in ["SI", "Tutor", "GT", "SST", "OursM"]:
-            users = User.objects.filter(groups__name="Staff").all()
-            active_sem = Semester.objects.get_active_sem()
-            if len(users) > 0:
-                user_ids = []
-                if group == "SST":
-                    SS_course = Course.objects.filter(department="STUDY-SKILL").all()
-                    user_ids = StaffUserPosition.objects.filter(Q(person__in=users) & Q(semester=active_sem) & Q(position="Tutor") & Q(tutor_courses__in=SS_course)).all().values('person')
-                else:
-                    user_ids = StaffUserPosition.objects.filter(Q(person__in=users) & Q(semester=active_sem) & Q(position=group)).all().values('person')
-                users = User.objects.filter(id__in=user_ids).all()
+            users = users.filter(
+                Exists(User.groups.through.objects.filter(lrcdatabaseuser=OuterRef("pk"), group__name="Staff")),
+                **{f"has_{group.lower()}": True},
+            )
         else:
-            users = User.objects.filter(groups__name=group).all()
+            users = users.filter(groups__name=group)
     else:
         group = "All users"
-        users = User.objects.all()
     group = "Study Skill Tutor" if group == "SST" else "Group Tutor" if group == "GT" else "OURS Mentor" if group == "OursM" else group
-    return render(request, "users/list_users.html", {"users": users, "group": group})
+
+    search = request.GET.get("q", "").strip()
+    for term in search.split():
+        users = users.filter(Q(first_name__icontains=term) | Q(last_name__icontains=term) | Q(email__icontains=term))
+
+    users = users.prefetch_related("groups").order_by("last_name", "first_name", "id")
+    paginator = Paginator(users, settings.USER_LIST_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get("page"))
+    return render(request, "users/list_users.html", {"users": page, "page": page, "group": group, "search": search})
 
 
 @restrict_to_groups("Office staff", "Supervisors")